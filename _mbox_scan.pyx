@@ -0,0 +1,43 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional native scanner for mbox "From " separator lines.
+
+Used by mbox_to_eml_converter.py when it can be imported; the converter
+falls back to a regular expression otherwise. Build it in place with:
+
+    pip install cython
+    cythonize -i _mbox_scan.pyx
+"""
+
+from libc.string cimport memchr, memcmp
+
+
+cpdef list scan(const unsigned char[::1] buf):
+    """
+    Find the start of every line beginning with "From ".
+
+    Args:
+        buf: Buffer with the mbox contents (bytes, mmap, ...)
+
+    Returns:
+        list: Offsets of the "From " lines, in ascending order
+    """
+    cdef list starts = []
+    cdef Py_ssize_t n = buf.shape[0]
+    if n == 0:
+        return starts
+
+    cdef const unsigned char *base = &buf[0]
+    cdef const unsigned char *end = base + n
+    cdef const unsigned char *p = base
+
+    while p < end:
+        if end - p >= 5 and memcmp(p, b"From ", 5) == 0:
+            starts.append(p - base)
+        # Jump straight to the next line
+        p = <const unsigned char *>memchr(p, ord('\n'), end - p)
+        if p == NULL:
+            break
+        p += 1
+
+    return starts
@@ -8,7 +8,7 @@ Each email message in the mbox file is extracted and saved as a separate .eml fi
 
 Features:
 - Handles multiple emails in a single mbox file
-- Preserves email headers and content
+- Preserves email headers and content (messages are copied byte-for-byte)
 - Creates sanitized filenames for eml files
 - Handles encoding issues gracefully
 - Progress tracking for large mbox files
@@ -18,21 +18,173 @@ Usage:
     python mbox_to_eml.py input.mbox [output_directory]
 
 Requirements:
-    - Python 3.x (uses built-in mailbox module)
+    - Python 3.x (standard library only: mmap, re, email)
+    - Optional: the _mbox_scan Cython extension for faster splitting of
+      large mbox files (build with: cythonize -i _mbox_scan.pyx)
 
 Author: AI Assistant
 Date: August 2025
 """
 
+import errno
 import mailbox
+import mmap
 import os
 import sys
 import re
 from email import message_from_string
-from email.generator import Generator
+from email.generator import BytesGenerator
+from email.parser import BytesHeaderParser
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    # Optional native "From " line scanner (see _mbox_scan.pyx)
+    from _mbox_scan import scan as _scan_from_lines
+except ImportError:
+    _scan_from_lines = None
+
+# Flags for creating .eml files with os.open (O_BINARY only exists on Windows)
+EML_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# Number of threads writing .eml files, and the maximum number of
+# messages waiting to be written (bounds memory usage)
+WRITE_WORKERS = os.cpu_count() or 4
+MAX_PENDING_WRITES = WRITE_WORKERS * 4
+
+# Start of a message in an mbox file ("From " at the beginning of a line)
+FROM_LINE_RE = re.compile(rb'^From ', re.MULTILINE)
+
+# Characters not allowed in filenames: replaced with '_' (control
+# characters are dropped instead)
+INVALID_CHARS_RE = re.compile(r'[<>:"/\|?*\x00-\x1f]')
+
+# Email address inside a From header
+EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+')
+
+# Characters replaced by simple_mbox_to_eml
+UNSAFE_SUBJECT_RE = re.compile(r'[^a-zA-Z0-9_-]')
+
+# End of a message's header block (the first empty line, LF or CRLF)
+HEADER_END_RE = re.compile(rb'\r?\n\r?\n')
+
+# The end of the header block is only searched for in this many leading
+# bytes; a message without one within it is parsed up to this size
+HEADER_SCAN_LIMIT = 1 << 20
+
+def iter_mbox_messages(mbox_file):
+    """
+    Iterate over the raw messages of an mbox file without parsing them.
+
+    The file is locked for reading (see _lock_mbox_shared), memory-mapped
+    and split on "From " separator lines, found
+    by the _mbox_scan extension if it is built, else by FROM_LINE_RE. Like
+    the mailbox module, the "From " line itself and the blank line that
+    separates two messages are not part of the yielded message.
+
+    Args:
+        mbox_file (str): Path to the mbox file
+
+    Yields:
+        bytes: Raw bytes of each message
+    """
+    with open(mbox_file, 'rb') as f:
+        # Another program truncating the file while it is mapped would
+        # crash this process with SIGBUS rather than raise an error
+        _lock_mbox_shared(f)
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if _scan_from_lines is not None:
+                offsets = _scan_from_lines(mm)
+            else:
+                offsets = (match.start() for match in FROM_LINE_RE.finditer(mm))
+
+            try:
+                start = None
+                for offset in offsets:
+                    if start is not None:
+                        yield _message_bytes(mm, start, offset)
+                    start = offset
+
+                if start is not None:
+                    yield _message_bytes(mm, start, len(mm))
+            finally:
+                # A suspended finditer() still holds a buffer export on the
+                # mapping, which would make closing it raise BufferError
+                del offsets
+
+def _message_bytes(mm, start, end):
+    """
+    Extract one message from a mapped mbox file.
+
+    Args:
+        mm: Memory-mapped mbox file
+        start (int): Offset of the message's "From " line
+        end (int): Offset of the next "From " line (or end of file)
+
+    Returns:
+        bytes: Message without its "From " line and trailing separator
+    """
+    body_start = mm.find(b'\n', start, end) + 1 or end
+
+    # Drop the empty line separating this message from the next one
+    if mm[end-4:end] == b'\r\n\r\n':
+        end -= 2
+    elif mm[end-2:end] == b'\n\n':
+        end -= 1
+
+    return mm[body_start:end]
+
+def _header_block(data):
+    """
+    Return the header block of a raw message, without its body.
+
+    Args:
+        data (bytes): Raw email message
+
+    Returns:
+        bytes: Message up to and including the empty line ending the headers
+    """
+    match = HEADER_END_RE.search(data, 0, HEADER_SCAN_LIMIT)
+    return data[:match.end() if match else HEADER_SCAN_LIMIT]
+
+def _lock_mbox_shared(f):
+    """
+    Take a shared (read) lock on an open mailbox file.
+
+    Only an fcntl lock is used, no <mbox>.lock dotlock file: it needs no
+    write access and goes away with the file handle, even if the process
+    dies. Writers holding the lock make this raise ExternalClashError;
+    where locking isn't available (Windows, some network filesystems) the
+    file is read unlocked.
+
+    Args:
+        f: Open mailbox file
+    """
+    if fcntl is None:
+        return
+    try:
+        fcntl.lockf(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            raise mailbox.ExternalClashError(
+                f"MBOX file is locked by another program: {f.name}") from e
+
+def _replace_invalid_char(match):
+    """Replacement for INVALID_CHARS_RE: drop control characters, '_' otherwise."""
+    return '' if match.group() < ' ' else '_'
+
 def sanitize_filename(filename, max_length=100):
     """
     Sanitize filename to be safe for filesystem.
@@ -44,10 +196,8 @@ def sanitize_filename(filename, max_length=100):
     Returns:
         str: Sanitized filename
     """
-    # Remove or replace invalid characters
-    filename = re.sub(r'[<>:"/\|?*]', '_', filename)
-    filename = re.sub(r'[\x00-\x1f]', '', filename)  # Remove control characters
-    filename = filename.strip()
+    # Remove or replace invalid characters in a single pass
+    filename = INVALID_CHARS_RE.sub(_replace_invalid_char, filename).strip()
 
     # Truncate if too long
     if len(filename) > max_length:
@@ -55,7 +205,7 @@ def sanitize_filename(filename, max_length=100):
 
     return filename if filename else "unnamed_email"
 
-def get_safe_filename(msg, index, output_dir):
+def get_safe_filename(msg, index, output_dir, used_names=None):
     """
     Generate a safe filename for the email message.
 
@@ -63,15 +213,21 @@ def get_safe_filename(msg, index, output_dir):
         msg: Email message object
         index (int): Message index
         output_dir (str): Output directory path
+        used_names (set): Filenames already handed out during this
+            conversion; the new name is added to it. Uniqueness is checked
+            against this set rather than with a stat() per candidate.
 
     Returns:
         str: Safe filename with full path
     """
+    if used_names is None:
+        used_names = set()
+
     subject = msg.get('Subject', 'No Subject')
     sender = msg.get('From', 'Unknown Sender')
 
     # Extract email address from sender if present
-    email_match = re.search(r'[\w\.-]+@[\w\.-]+', sender)
+    email_match = EMAIL_RE.search(sender)
     sender_name = email_match.group(0) if email_match else sender
 
     # Create base filename from subject and sender
@@ -79,15 +235,59 @@ def get_safe_filename(msg, index, output_dir):
 
     # Ensure unique filename
     filename = f"{base_name}.eml"
-    filepath = os.path.join(output_dir, filename)
 
     counter = 1
-    while os.path.exists(filepath):
+    while filename in used_names:
         filename = f"{base_name}_{counter}.eml"
-        filepath = os.path.join(output_dir, filename)
         counter += 1
 
-    return filepath
+    used_names.add(filename)
+    return os.path.join(output_dir, filename)
+
+def _write_eml(data, filepath):
+    """
+    Write message bytes to an eml file.
+
+    The whole message goes to the kernel in a single os.write() call
+    (repeated only if the OS accepts a partial write), with no Python
+    file object or buffer in between. Runs on the writer threads of
+    convert_mbox_to_eml.
+
+    Args:
+        data (bytes): Raw email message (any bytes-like object)
+        filepath (str): Destination eml file path
+    """
+    fd = os.open(filepath, EML_OPEN_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def _report_write(index, eml_filepath, future, verbose):
+    """
+    Wait for a pending eml write and report its outcome.
+
+    Args:
+        index (int): Message index
+        eml_filepath (str): Destination eml file path
+        future: Future returned by the writer pool
+        verbose (bool): Enable verbose output
+
+    Returns:
+        bool: True if the file was written successfully
+    """
+    try:
+        future.result()
+    except Exception as e:
+        if verbose:
+            print(f"[{index:04d}] ✗ Error processing message: {str(e)}")
+        return False
+
+    if verbose:
+        print(f"[{index:04d}] ✓ {os.path.basename(eml_filepath)}")
+    return True
 
 def convert_mbox_to_eml(mbox_file, output_dir="eml_output", verbose=True):
     """
@@ -112,39 +312,53 @@ def convert_mbox_to_eml(mbox_file, output_dir="eml_output", verbose=True):
     total_count = 0
 
     try:
-        # Open the mbox file
-        mbox = mailbox.mbox(mbox_file)
+        header_parser = BytesHeaderParser()
+        used_names = set()
 
         if verbose:
             print(f"Processing mbox file: {mbox_file}")
             print(f"Output directory: {output_dir}")
             print("-" * 50)
 
-        # Iterate through each message in the mbox
-        for index, message in enumerate(mbox, 1):
-            total_count = index
-
-            try:
-                # Generate safe filename
-                eml_filepath = get_safe_filename(message, index, output_dir)
+        # Messages are split and their headers parsed on this thread; the
+        # file writes are handed to a thread pool
+        pending = deque()
+
+        def collect(max_pending):
+            # Report finished writes in order, waiting on the oldest ones
+            # while more than max_pending are still outstanding
+            nonlocal success_count, error_count
+            while pending and (len(pending) > max_pending or pending[0][2].done()):
+                if _report_write(*pending.popleft(), verbose):
+                    success_count += 1
+                else:
+                    error_count += 1
+
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as executor:
+            # Iterate through each message in the mbox
+            for index, data in enumerate(iter_mbox_messages(mbox_file), 1):
+                total_count = index
+
+                try:
+                    # Only the headers are needed to name the file; the
+                    # message itself is written out unchanged
+                    headers = header_parser.parsebytes(_header_block(data))
+
+                    # Generate safe filename
+                    eml_filepath = get_safe_filename(headers, index, output_dir, used_names)
+
+                except Exception as e:
+                    error_count += 1
+                    if verbose:
+                        print(f"[{index:04d}] ✗ Error processing message: {str(e)}")
+                    continue
 
                 # Write the message to eml file
-                with open(eml_filepath, 'w', encoding='utf-8', errors='replace') as eml_file:
-                    # Use Generator to properly format the email
-                    gen = Generator(eml_file)
-                    gen.flatten(message)
+                future = executor.submit(_write_eml, data, eml_filepath)
+                pending.append((index, eml_filepath, future))
+                collect(MAX_PENDING_WRITES)
 
-                success_count += 1
-
-                if verbose:
-                    subject = message.get('Subject', 'No Subject')[:50]
-                    print(f"[{index:04d}] ✓ {os.path.basename(eml_filepath)}")
-
-            except Exception as e:
-                error_count += 1
-                if verbose:
-                    print(f"[{index:04d}] ✗ Error processing message: {str(e)}")
-                continue
+            collect(0)
 
         if verbose:
             print("-" * 50)
@@ -234,17 +448,34 @@ def simple_mbox_to_eml(mbox_path, output_dir="eml_files"):
     # Open mbox file
     mbox = mailbox.mbox(mbox_path)
 
-    for i, message in enumerate(mbox, 1):
-        # Create filename
-        subject = message.get('Subject', 'No_Subject')
-        # Clean subject for filename
-        clean_subject = re.sub(r'[^a-zA-Z0-9_-]', '_', subject)[:30]
-        filename = f"{i:04d}_{clean_subject}.eml"
+    # Serialization buffer shared by all messages. It is rewound but never
+    # truncated, so it keeps its largest size instead of growing again
+    scratch = BytesIO()
 
-        # Write eml file
-        with open(os.path.join(output_dir, filename), 'w') as f:
-            f.write(str(message))
-
-        print(f"Converted: {filename}")
+    try:
+        # Keeps other programs from changing the file while it is read
+        _lock_mbox_shared(mbox._file)
+
+        for i, message in enumerate(mbox, 1):
+            # Create filename
+            subject = message.get('Subject', 'No_Subject')
+            # Clean subject for filename
+            clean_subject = UNSAFE_SUBJECT_RE.sub('_', subject)[:30]
+            filename = f"{i:04d}_{clean_subject}.eml"
+
+            # Serialize like message.as_bytes(), but into the shared buffer
+            scratch.seek(0)
+            gen = BytesGenerator(scratch, mangle_from_=False, policy=message.policy)
+            gen.flatten(message, unixfrom=False)
+            size = scratch.tell()
+
+            # Write eml file (binary, so no platform-dependent text encoding)
+            # with a single write of the serialized message
+            with scratch.getbuffer() as view:
+                _write_eml(view[:size], os.path.join(output_dir, filename))
+
+            print(f"Converted: {filename}")
+    finally:
+        mbox.close()  # also releases the lock
 
     print(f"Conversion complete. {i} messages converted.")
@@ -23,10 +23,9 @@ Python 3.6 or newer
 
 Standard library modules (no external dependencies):
 – tkinter (GUI framework)
-– mailbox (to read MBOX files)
-– email and email.header (to parse and decode messages)
-– email.generator.Generator (to write EML files)
-– shutil (to copy files)
+– mailbox (to locate messages in MBOX files)
+– email.parser and email.header (to parse and decode message headers)
+– zipfile and tarfile (optional .zip/.tar batch archives)
 – pathlib (for cross-platform path handling)
 – re (for filename sanitization)
 – datetime (to timestamp instructions)
@@ -35,31 +34,120 @@ A graphical desktop environment (Windows, macOS, or Linux) with Tkinter installe
 
 Sufficient file system permissions to read the source .mbox file and write to the target output directory
 
-At least 100 MB of free disk space for intermediate and batch folders (depending on the total size of your emails)
+At least 100 MB of free disk space for the batch folders (depending on the total size of your emails)
 """
 
+import errno
 import os
 import mailbox
-import shutil
-from email.generator import Generator
+import queue
+import threading
 from email.header import decode_header
+from email.parser import BytesHeaderParser
 import email
 import sys
 import re
+import tarfile
+import time
+import zipfile
 import tkinter as tk
 from tkinter import filedialog, messagebox
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Output buffer size for batch archives (1 MiB instead of the 8 KiB default)
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Flags for creating .eml files with os.open (O_BINARY only exists on Windows)
+EML_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+# Writer threads and maximum number of messages waiting to be written
+WRITE_WORKERS = os.cpu_count() or 4
+MAX_PENDING_WRITES = WRITE_WORKERS * 4
+
+# How often the Tk thread drains the conversion thread's log queue
+LOG_FLUSH_MS = 100
+
+# End of a message's header block (the first empty line, LF or CRLF); it
+# is only searched for in the first HEADER_SCAN_LIMIT bytes
+HEADER_END_RE = re.compile(rb'\r?\n\r?\n')
+HEADER_SCAN_LIMIT = 1 << 20
+
+# Filename sanitization patterns, compiled once instead of per message
+INVALID_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+def _read_at(f, start, stop):
+    # One positioned read where available (os.pread is POSIX-only)
+    if hasattr(os, "pread"):
+        return os.pread(f.fileno(), stop-start, start)
+    f.seek(start)
+    return f.read(stop-start)
+
+def _lock_mbox_shared(f):
+    # Shared fcntl lock only: unlike mailbox.lock() it leaves no <mbox>.lock
+    # dotlock behind if the process dies, and needs no write access. Without
+    # lock support (Windows, some network filesystems) the file is read unlocked
+    if fcntl is None:
+        return
+    try:
+        fcntl.lockf(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            raise mailbox.ExternalClashError(
+                f"MBOX file is locked by another program: {f.name}") from e
+
+def _write_eml(data, path):
+    # One os.write() per message (looping only on a partial write)
+    fd = os.open(path, EML_OPEN_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+class _BatchArchive:
+    """A .zip (uncompressed) or .tar file receiving one batch of messages."""
+
+    def __init__(self, path, fmt):
+        self._file = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+        if fmt == "zip":
+            self._archive = zipfile.ZipFile(self._file, "w", zipfile.ZIP_STORED)
+        else:
+            self._archive = tarfile.open(fileobj=self._file, mode="w")
+
+    def add(self, name, data):
+        if isinstance(self._archive, zipfile.ZipFile):
+            self._archive.writestr(name, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._archive.addfile(info, BytesIO(data))
+
+    def close(self):
+        self._archive.close()
+        self._file.close()
+
 class MboxToEmlBatchGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("MBOX→EML Batch Import Tool")
-        self.geometry("500x380")
+        self.geometry("500x430")
         self.mbox_path = tk.StringVar()
         self.output_dir = tk.StringVar(value="eml_batches")
         self.batch_size = tk.IntVar(value=50)
         self.batch_mb = tk.IntVar(value=100)
+        self.batch_format = tk.StringVar(value="dir")
 
         tk.Label(self, text="Select MBOX File:").pack(anchor="w", padx=10, pady=5)
         tk.Entry(self, textvariable=self.mbox_path, width=50).pack(padx=10)
@@ -75,11 +163,25 @@ class MboxToEmlBatchGUI(tk.Tk):
         tk.Label(self, text="Max Batch Size (MB):").pack(anchor="w", padx=10, pady=5)
         tk.Entry(self, textvariable=self.batch_mb, width=10).pack(padx=10)
 
-        tk.Button(self, text="Run Conversion", command=self.run).pack(pady=15)
+        tk.Label(self, text="Batch Format (dir/zip/tar):").pack(anchor="w", padx=10, pady=5)
+        tk.OptionMenu(self, self.batch_format, "dir", "zip", "tar").pack(padx=10)
+
+        self.run_button = tk.Button(self, text="Run Conversion", command=self.run)
+        self.run_button.pack(pady=15)
 
         self.log = tk.Text(self, height=6)
         self.log.pack(fill="both", padx=10, pady=5)
 
+        # The conversion runs on a worker thread; it only talks to Tk through
+        # this queue and _finished, both picked up by _pump_log
+        self._log_q = queue.Queue()
+        self._finished = None
+        self._worker = None
+        self._stop = threading.Event()
+        self._close_when_done = False
+        self.after(LOG_FLUSH_MS, self._pump_log)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
     def browse_mbox(self):
         path = filedialog.askopenfilename(filetypes=[("MBOX files","*.mbox"),("All","*.*")])
         if path:
@@ -90,23 +192,63 @@ class MboxToEmlBatchGUI(tk.Tk):
         if path:
             self.output_dir.set(path)
 
+    def _on_close(self):
+        if not (self._worker and self._worker.is_alive()):
+            self.destroy()
+            return
+        # Let the worker stop between messages and finish its batches,
+        # instead of killing it with half-written output
+        if messagebox.askokcancel("Quit", "A conversion is still running.\n"
+                                  "Stop it and quit once the batches written so far are finished?"):
+            self._stop.set()
+            self._close_when_done = True
+            self.log_msg("Stopping…")
+
     def log_msg(self, msg):
-        self.log.insert("end", msg+"\n")
-        self.log.see("end")
-        self.update()
+        self._log_q.put(msg)
+
+    def _pump_log(self):
+        # Read _finished first: its log lines are queued before it is set
+        finished, lines = self._finished, []
+        while True:
+            try:
+                lines.append(self._log_q.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            self.log.insert("end", "\n".join(lines)+"\n")
+            self.log.see("end")
+        if finished and self._close_when_done:
+            self.destroy()
+            return
+        self.after(LOG_FLUSH_MS, self._pump_log)
+        if finished:
+            self._finished = None
+            self.run_button.config(state="normal")
+            title, text, failed = finished
+            if failed:
+                messagebox.showerror(title, text)
+            else:
+                messagebox.showinfo(title, text)
 
     def sanitize(self, text, max_len=50):
-        text = re.sub(r'[<>:"/\\|?*]', '_', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = INVALID_CHARS_RE.sub('_', text)
+        text = WHITESPACE_RE.sub(' ', text).strip()
         return text[:max_len] or "No_Subject"
 
     def decode_subject(self, raw_subj):
+        if raw_subj is None:
+            return "No_Subject"
+        # Subjects without encoded words (=?charset?...?=) come back unchanged
+        # from decode_header, so skip it for them
+        if isinstance(raw_subj, str) and '=?' not in raw_subj:
+            return raw_subj
         try:
             parts = decode_header(raw_subj)
-            decoded = ''.join(
+            decoded = ''.join([
                 part.decode(enc or 'utf-8', errors='ignore') if isinstance(part, bytes) else part
                 for part, enc in parts
-            )
+            ])
             return decoded
         except Exception:
             return "No_Subject"
@@ -116,6 +258,7 @@ class MboxToEmlBatchGUI(tk.Tk):
         out_dir = Path(self.output_dir.get())
         bs = self.batch_size.get()
         mb = self.batch_mb.get()
+        fmt = self.batch_format.get()
 
         if not mbox_file.exists():
             messagebox.showerror("Error","MBOX file not found")
@@ -126,50 +269,110 @@ class MboxToEmlBatchGUI(tk.Tk):
             messagebox.showerror("Error","Cannot create output directory")
             return
 
-        # Step 1: Convert .mbox → .eml
+        self.run_button.config(state="disabled")
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run_conversion,
+                                        args=(mbox_file, out_dir, bs, mb, fmt), daemon=True)
+        self._worker.start()
+
+    def _run_conversion(self, *args):
+        try:
+            total = self._do_conversion(*args)
+        except Exception as e:
+            self.log_msg(f"✗ Conversion failed: {e}")
+            self._finished = ("Error", f"Conversion failed:\n{e}", True)
+        else:
+            if self._stop.is_set():
+                self._finished = ("Stopped", f"Conversion stopped after {total} messages.\nSee log for details.", False)
+            else:
+                self._finished = ("Done", "Conversion & batching complete!\nSee log for details.", False)
+
+    def _do_conversion(self, mbox_file, out_dir, bs, mb, fmt):
+        # Runs on the worker thread: no Tk calls here, only log_msg()
+        # Step 1: Convert .mbox → .eml, straight into the batches
+        # Only mailbox's table of contents is used: each message is copied
+        # as raw bytes, and only its headers are parsed (for the filename).
+        # A batch is closed once it holds bs messages or the next message
+        # would push it past the size limit.
         mbox = mailbox.mbox(str(mbox_file))
-        eml_dir = out_dir / "all_eml"
-        eml_dir.mkdir(exist_ok=True)
-        self.log_msg("Converting .mbox to .eml…")
-        for i, msg in enumerate(mbox, 1):
-            raw_subj = msg.get('Subject','No_Subject')
-            subj = self.decode_subject(raw_subj)
-            safe_subj = self.sanitize(subj)
-            fn = f"{i:05d}_{safe_subj}.eml"
-            path = eml_dir / fn
-            with open(path, "w", encoding="utf-8", errors="replace") as f:
-                Generator(f).flatten(msg)
-            if i % 50 == 0:
-                self.log_msg(f"  Converted {i} messages")
-        total = i
+        header_parser = BytesHeaderParser()
+        maxb=mb*1024*1024
+        if fmt=="dir":
+            self.log_msg("Converting .mbox to .eml batch folders…")
+        else:
+            self.log_msg(f"Converting .mbox to .eml .{fmt} batch archives…")
+        batches=[]  # [path, message count] per batch
+        cur_size=0
+        archive=None
+        total=0
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+            try:
+                # Keeps other programs from changing the file under the TOC
+                _lock_mbox_shared(mbox._file)
+                mbox._generate_toc()
+                for i, key in enumerate(sorted(mbox._toc), 1):
+                    if self._stop.is_set():
+                        # Steps 2-4 still run for the messages written so far
+                        self.log_msg(f"✗ Stopped after {total} messages")
+                        break
+                    start, stop = mbox._toc[key]
+                    raw = _read_at(mbox._file, start, stop)
+                    data = raw[raw.find(b"\n")+1:]  # drop the "From " line
+                    m = HEADER_END_RE.search(data, 0, HEADER_SCAN_LIMIT)
+                    msg = header_parser.parsebytes(data[:m.end() if m else HEADER_SCAN_LIMIT])
+                    raw_subj = msg.get('Subject','No_Subject')
+                    subj = self.decode_subject(raw_subj)
+                    safe_subj = self.sanitize(subj)
+                    fn = f"{i:05d}_{safe_subj}.eml"
+                    sz = len(data)
+                    if not batches or batches[-1][1]>=bs or cur_size+sz>maxb:
+                        if archive:
+                            archive.close()
+                            archive = None
+                        bd=out_dir/f"batch_{len(batches)+1:03d}"
+                        if fmt=="dir":
+                            bd.mkdir(exist_ok=True)
+                        else:
+                            bd=bd.with_suffix("."+fmt)
+                            archive=_BatchArchive(bd, fmt)
+                        batches.append([bd, 0]); cur_size=0
+                    batches[-1][1]+=1; cur_size+=sz
+                    if archive:
+                        archive.add(fn, data)
+                    else:
+                        pending.append(pool.submit(_write_eml, data, batches[-1][0]/fn))
+                        while pending and (len(pending) > MAX_PENDING_WRITES or pending[0].done()):
+                            pending.popleft().result()
+                    total = i
+                    if i % 50 == 0:
+                        self.log_msg(f"  Converted {i} messages")
+            finally:
+                if archive:
+                    archive.close()
+                mbox.close()  # also releases the lock
+            for fut in pending:
+                fut.result()
         self.log_msg(f"✓ Converted {total} messages")
 
-        # Step 2: Batch splitting
-        self.log_msg("Creating import batches…")
-        eml_files = sorted(eml_dir.glob("*.eml"), key=lambda p: p.stat().st_size)
-        batches=[]
-        cur,cur_size=[],0
-        maxb=mb*1024*1024
-        for f in eml_files:
-            sz=f.stat().st_size
-            if len(cur)>=bs or cur_size+sz>maxb:
-                batches.append(cur); cur,cur_size=[],0
-            cur.append(f); cur_size+=sz
-        if cur: batches.append(cur)
+        # Step 2: Name batches after their message count
         self.log_msg(f"→ {len(batches)} batches created")
-
-        # Step 3: Copy to batch folders
-        self.log_msg("Copying to batch folders…")
         batch_dirs=[]
-        for idx,b in enumerate(batches,1):
-            bd=out_dir/f"batch_{idx:03d}_{len(b)}msg"
-            bd.mkdir(exist_ok=True)
-            for e in b:
-                shutil.copy2(str(e), str(bd/e.name))
+        for idx,(bd,n) in enumerate(batches,1):
+            final=bd.with_name(f"batch_{idx:03d}_{n}msg{bd.suffix}")
+            if final.is_dir():
+                # Left from an earlier run into the same output directory
+                with os.scandir(bd) as entries:
+                    for e in entries:
+                        os.replace(e.path, final/e.name)
+                bd.rmdir()
+            else:
+                os.replace(bd, final)
+            bd=final
             batch_dirs.append(str(bd))
-            self.log_msg(f"  Batch {idx:03d}: {len(b)} messages → {bd.name}")
+            self.log_msg(f"  Batch {idx:03d}: {n} messages → {bd.name}")
 
-        # Step 4: Write instructions
+        # Step 3: Write instructions
         inst=out_dir/"IMPORT_INSTRUCTIONS.txt"
         with open(inst, "w", encoding="utf-8") as f:
             f.write(f"MBOX→EML Batch Import Instructions\n")
@@ -181,7 +384,7 @@ class MboxToEmlBatchGUI(tk.Tk):
                 f.write(f"Batch {i}: {Path(bd).name}\n")
         self.log_msg(f"✓ Instructions: {inst.name}")
 
-        # Step 5: Verification script
+        # Step 4: Verification script
         ver=out_dir/"verify_import_success.py"
         with open(ver, "w", encoding="utf-8") as f:
             f.write(f"""#!/usr/bin/env python3
@@ -192,8 +395,7 @@ print("Expected messages: {total}")
 print("-- Check your email client folder has this count --")
 """)
         self.log_msg(f"✓ Verification: {ver.name}")
-
-        messagebox.showinfo("Done","Conversion & batching complete!\nSee log for details.")
+        return total
 
 if __name__=="__main__":
     app = MboxToEmlBatchGUI()